@@ -2,26 +2,45 @@
 PA County Records Audit — Haiku Batch Runner
 =============================================
 Sends batched county research prompts to Claude Haiku via the Anthropic API.
-Requires: pip install anthropic
+Requires: pip install anthropic (optional: orjson for faster JSON parsing)
 
 Usage:
     python run_batch.py                    # Run all unresearched batches
     python run_batch.py --batch 2          # Run specific batch (2-7)
     python run_batch.py --verify           # Verify needs_review entries
     python run_batch.py --dry-run          # Print prompts without calling API
+    python run_batch.py --all --use-batch-api  # Submit via Message Batches API (50% cost)
 
-Set ANTHROPIC_API_KEY env var before running.
+Set ANTHROPIC_API_KEY env var before running. ANTHROPIC_RPM / ANTHROPIC_TPM
+override the default rate limits (40 requests/min, 16k tokens/min).
+
+Successful responses are cached in data/raw_responses/_cache/ and reused for
+identical prompts, and --verify skips counties whose row is unchanged since its
+last verification. Set AI_CACHE_FORCE_REFRESH=1 to bypass both caches.
 """
 
 import anthropic
+import asyncio
 import json
 import csv
+import hashlib
+import io
 import os
 import sys
 import argparse
 from datetime import date
+from operator import itemgetter
 from pathlib import Path
 
+from constants import ALL_COUNTIES
+
+try:
+    import orjson as _json
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    _json = json
+
+JSONDecodeError = getattr(_json, "JSONDecodeError", ValueError)
+
 # ---------------------------------------------------------------------------
 # Config
 # ---------------------------------------------------------------------------
@@ -31,6 +50,19 @@ PROMPTS_DIR = Path(__file__).parent / "prompts"
 SEED_FILE = Path(__file__).parent / "seed_counties.csv"
 OUTPUT_FILE = DATA_DIR / "counties.csv"
 RAW_DIR = DATA_DIR / "raw_responses"
+CACHE_DIR = RAW_DIR / "_cache"
+VERIFY_CACHE_FILE = RAW_DIR / "_verify_cache.json"
+TODAY = date.today().isoformat()  # fixed at startup so a run spanning midnight stays consistent
+MAX_CONCURRENCY = 4  # max in-flight API requests
+MAX_RETRIES = 3
+MAX_TOKENS = 4096
+# Rate limits for the account's API tier; override via env vars
+REQUESTS_PER_MINUTE = int(os.environ.get("ANTHROPIC_RPM", 40))
+TOKENS_PER_MINUTE = int(os.environ.get("ANTHROPIC_TPM", 16000))
+BATCH_POLL_INTERVAL = 30  # seconds between Message Batches status checks
+
+# Output row order: PA counties alphabetically
+_CANONICAL_COUNTIES = tuple(sorted(ALL_COUNTIES))
 
 # All 67 PA counties grouped into batches
 BATCHES = {
@@ -67,7 +99,10 @@ For vendor identification, look for these known vendors:
 
 Respond ONLY with a valid JSON array. No commentary, no markdown fences, no preamble."""
 
-USER_PROMPT_TEMPLATE = """Research the following Pennsylvania counties and classify their Recorder of Deeds online access. Use web search for each one.
+
+def build_user_prompt(counties: str, today: str) -> str:
+    """Build the research prompt for a comma-separated list of counties."""
+    return f"""Research the following Pennsylvania counties and classify their Recorder of Deeds online access. Use web search for each one.
 
 Counties: {counties}
 
@@ -94,6 +129,7 @@ For each county, return a JSON object with these exact fields:
 
 Return ONLY a JSON array of objects. No other text."""
 
+
 VERIFY_SYSTEM_PROMPT = """You are verifying Pennsylvania county Recorder of Deeds access data. You will be given existing data for a county. Use web search to confirm or correct each field.
 
 If the data is correct, return it unchanged with "status": "verified".
@@ -105,6 +141,73 @@ Respond ONLY with a valid JSON object. No commentary."""
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
+class AsyncLeakyBucket:
+    """Token bucket limiting requests/min and tokens/min before each API call."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.max_requests = float(requests_per_minute)
+        self.max_tokens = float(tokens_per_minute)
+        self.available_requests = self.max_requests
+        self.available_tokens = self.max_tokens
+        self._last_refill = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        if self._last_refill is not None:
+            elapsed = now - self._last_refill
+            self.available_requests = min(self.max_requests, self.available_requests + elapsed * self.max_requests / 60)
+            self.available_tokens = min(self.max_tokens, self.available_tokens + elapsed * self.max_tokens / 60)
+        self._last_refill = now
+
+    async def acquire(self, requests: int = 1, tokens: int = 0):
+        """Wait until capacity is available, then consume it."""
+        # A single request larger than the bucket can never fit; cap it to a full bucket
+        requests = min(requests, self.max_requests)
+        tokens = min(tokens, self.max_tokens)
+        loop = asyncio.get_running_loop()
+        async with self._lock:  # first come, first served
+            while True:
+                self._refill(loop.time())
+                if self.available_requests >= requests and self.available_tokens >= tokens:
+                    self.available_requests -= requests
+                    self.available_tokens -= tokens
+                    return
+                wait = max(
+                    (requests - self.available_requests) * 60 / self.max_requests,
+                    (tokens - self.available_tokens) * 60 / self.max_tokens,
+                )
+                await asyncio.sleep(wait)
+
+
+_client = None
+_semaphore = None
+_bucket = None
+
+
+def get_client() -> anthropic.AsyncAnthropic:
+    """Return the shared async client, created on first use."""
+    global _client
+    if _client is None:
+        _client = anthropic.AsyncAnthropic(max_retries=MAX_RETRIES)
+    return _client
+
+
+def get_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore bounding in-flight API requests."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _semaphore
+
+
+def get_bucket() -> AsyncLeakyBucket:
+    """Return the shared rate limiter."""
+    global _bucket
+    if _bucket is None:
+        _bucket = AsyncLeakyBucket(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+    return _bucket
+
+
 def load_seed_data() -> dict:
     """Load seed CSV into a dict keyed by county name."""
     data = {}
@@ -123,14 +226,13 @@ def get_seeded_counties(seed: dict, status_filter: str = None) -> set:
     return set(seed.keys())
 
 
-def get_unresearched_for_batch(batch_num: int, seed: dict) -> list:
+def get_unresearched_for_batch(batch_num: int, verified: set) -> list:
     """Get counties in a batch that haven't been fully researched."""
-    verified = get_seeded_counties(seed, "verified")
     return [c for c in BATCHES[batch_num] if c not in verified]
 
 
 def parse_response(text: str) -> list:
-    """Parse JSON array from Haiku response, handling common issues."""
+    """Parse JSON from a Haiku response (array for batches, object for verify), handling common issues."""
     text = text.strip()
     # Strip markdown fences if Haiku adds them despite instructions
     if text.startswith("```"):
@@ -138,19 +240,98 @@ def parse_response(text: str) -> list:
     if text.endswith("```"):
         text = text.rsplit("```", 1)[0]
     text = text.strip()
-    return json.loads(text)
+    return _json.loads(text.encode())
 
 
 def save_raw_response(batch_num: int, response_text: str):
     """Save raw API response for debugging."""
     RAW_DIR.mkdir(parents=True, exist_ok=True)
-    path = RAW_DIR / f"batch_{batch_num}_{date.today().isoformat()}.json"
+    path = RAW_DIR / f"batch_{batch_num}_{TODAY}.json"
     with open(path, "w") as f:
         f.write(response_text)
     print(f"  Raw response saved: {path}")
 
 
-def call_haiku(system: str, user: str, dry_run: bool = False) -> str:
+def cache_path(system: str, user: str) -> Path:
+    """Path of the cached response for a (model, system, user) prompt."""
+    key = hashlib.sha256((MODEL + system + user).encode()).hexdigest()
+    return CACHE_DIR / f"{key}.json"
+
+
+def read_cached_response(system: str, user: str) -> str:
+    """Return the cached response text for a prompt, or None."""
+    if os.environ.get("AI_CACHE_FORCE_REFRESH"):
+        return None
+    path = cache_path(system, user)
+    if not path.exists():
+        return None
+    return path.read_text()
+
+
+def write_cached_response(system: str, user: str, response_text: str):
+    """Cache a response, but only if it is non-empty and parse_response accepts it.
+
+    Batch and verify replies are both decoded with parse_response, so a cached
+    response is always one its caller can parse.
+    """
+    if not response_text.strip():
+        return
+    try:
+        parse_response(response_text)
+    except JSONDecodeError:
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = cache_path(system, user)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(response_text)
+    os.replace(tmp, path)
+
+
+def row_hash(row: dict) -> str:
+    """Verify-cache key for a seed row: model, verify prompt and row (key-order independent)."""
+    key = MODEL + VERIFY_SYSTEM_PROMPT + json.dumps(row, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def load_verify_cache() -> dict:
+    """Load the row-hash -> verified result cache."""
+    if not VERIFY_CACHE_FILE.exists():
+        return {}
+    return _json.loads(VERIFY_CACHE_FILE.read_bytes())
+
+
+def save_verify_cache(cache: dict):
+    """Persist the verify cache atomically."""
+    data = _json.dumps(cache)
+    if isinstance(data, str):  # stdlib json returns str, orjson bytes
+        data = data.encode()
+    RAW_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = VERIFY_CACHE_FILE.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, VERIFY_CACHE_FILE)
+
+
+def build_request_params(system: str, user: str) -> dict:
+    """Build the messages.create parameters shared by live and batch calls."""
+    return {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "system": system,
+        "tools": [{"type": "web_search_20250305", "name": "web_search"}],
+        "messages": [{"role": "user", "content": user}],
+    }
+
+
+def extract_text(message) -> str:
+    """Join the text content blocks of a Message."""
+    text_parts = []
+    for block in message.content:
+        if hasattr(block, "text"):
+            text_parts.append(block.text)
+    return "\n".join(text_parts)
+
+
+async def call_haiku(system: str, user: str, dry_run: bool = False) -> str:
     """Call Claude Haiku API."""
     if dry_run:
         print("\n--- DRY RUN: Would send this prompt ---")
@@ -159,89 +340,206 @@ def call_haiku(system: str, user: str, dry_run: bool = False) -> str:
         print("--- END DRY RUN ---\n")
         return "[]"
 
-    client = anthropic.Anthropic()
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=4096,
-        system=system,
-        tools=[{"type": "web_search_20250305", "name": "web_search"}],
-        messages=[{"role": "user", "content": user}],
-    )
+    cached = read_cached_response(system, user)
+    if cached is not None:
+        return cached
 
-    # Extract text from response content blocks
-    text_parts = []
-    for block in response.content:
-        if hasattr(block, "text"):
-            text_parts.append(block.text)
-    return "\n".join(text_parts)
+    # Rough estimate: ~4 characters per input token
+    estimated_tokens = len(system) // 4 + len(user) // 4 + MAX_TOKENS
+    # Stream text deltas into one buffer; text blocks are newline-separated as in extract_text
+    buf = io.StringIO()
+    async with get_semaphore():
+        await get_bucket().acquire(requests=1, tokens=estimated_tokens)
+        async with get_client().messages.stream(**build_request_params(system, user)) as stream:
+            async for event in stream:
+                if event.type == "content_block_start" and event.content_block.type == "text" and buf.tell():
+                    buf.write("\n")
+                elif event.type == "text":
+                    buf.write(event.text)
+
+    response_text = buf.getvalue()
+    write_cached_response(system, user, response_text)
+    return response_text
 
 
 # ---------------------------------------------------------------------------
 # Commands
 # ---------------------------------------------------------------------------
-def run_batch(batch_num: int, seed: dict, dry_run: bool = False):
-    """Research a single batch of counties."""
-    counties = get_unresearched_for_batch(batch_num, seed)
+def prepare_batch(batch_num: int, verified: set) -> str:
+    """Build the user prompt for a batch, or return None if nothing to research."""
+    counties = get_unresearched_for_batch(batch_num, verified)
     if not counties:
         print(f"Batch {batch_num}: All counties already verified. Skipping.")
-        return []
+        return None
 
     print(f"Batch {batch_num}: Researching {len(counties)} counties: {', '.join(counties)}")
 
-    user_prompt = USER_PROMPT_TEMPLATE.format(
-        counties=", ".join(counties),
-        today=date.today().isoformat(),
-    )
-
-    response_text = call_haiku(SYSTEM_PROMPT, user_prompt, dry_run)
-    save_raw_response(batch_num, response_text)
+    return build_user_prompt(", ".join(counties), TODAY)
 
-    if dry_run:
-        return []
 
+def handle_batch_response(batch_num: int, response_text: str) -> list:
+    """Parse a batch response into county records."""
     try:
         results = parse_response(response_text)
         print(f"  Parsed {len(results)} county records.")
         return results
-    except json.JSONDecodeError as e:
+    except JSONDecodeError as e:
         print(f"  ERROR parsing batch {batch_num}: {e}")
         print(f"  Raw response saved for debugging.")
         return []
 
 
-def run_verify(seed: dict, dry_run: bool = False):
-    """Verify counties with needs_review status."""
-    to_verify = {name: row for name, row in seed.items() if row.get("status") == "needs_review"}
-    if not to_verify:
-        print("No counties need verification.")
+async def run_batch(batch_num: int, verified: set, dry_run: bool = False):
+    """Research a single batch of counties."""
+    user_prompt = prepare_batch(batch_num, verified)
+    if user_prompt is None:
         return []
 
-    print(f"Verifying {len(to_verify)} counties: {', '.join(to_verify.keys())}")
+    response_text = await call_haiku(SYSTEM_PROMPT, user_prompt, dry_run)
+    save_raw_response(batch_num, response_text)
 
-    results = []
-    for name, row in to_verify.items():
-        user_prompt = f"""Verify the following PA county Recorder of Deeds data using web search. Visit the recorder_url and source_url to confirm accuracy.
+    if dry_run:
+        return []
+
+    return handle_batch_response(batch_num, response_text)
+
+
+async def verify_county(name: str, row: dict, dry_run: bool = False) -> str:
+    """Ask Haiku to verify one county's row. Returns the raw response text."""
+    user_prompt = f"""Verify the following PA county Recorder of Deeds data using web search. Visit the recorder_url and source_url to confirm accuracy.
 
 Current data:
 {json.dumps(row, indent=2)}
 
 Return the verified/corrected JSON object. If you made corrections, add a "corrections" field as an array of strings describing what changed."""
 
-        response_text = call_haiku(VERIFY_SYSTEM_PROMPT, user_prompt, dry_run)
-        save_raw_response(f"verify_{name}", response_text)
+    response_text = await call_haiku(VERIFY_SYSTEM_PROMPT, user_prompt, dry_run)
+    save_raw_response(f"verify_{name}", response_text)
+    return response_text
+
+
+async def run_verify(seed: dict, dry_run: bool = False):
+    """Verify counties with needs_review status."""
+    to_verify = {name: row for name, row in seed.items() if row.get("status") == "needs_review"}
+    if not to_verify:
+        print("No counties need verification.")
+        return []
+
+    print(f"Verifying {len(to_verify)} counties: {', '.join(to_verify.keys())}")
+
+    # Rows unchanged since their last verification are answered from the cache
+    cache = load_verify_cache()
+    force_refresh = bool(os.environ.get("AI_CACHE_FORCE_REFRESH"))
+    hashes = {name: row_hash(row) for name, row in to_verify.items()}
+    # Dry runs still print every prompt, cached or not
+    pending = [name for name in to_verify if dry_run or force_refresh or hashes[name] not in cache]
+
+    # All pending counties are submitted at once; call_haiku's semaphore bounds concurrency
+    responses = await asyncio.gather(
+        *(verify_county(name, to_verify[name], dry_run) for name in pending),
+        return_exceptions=True,
+    )
+    responses = dict(zip(pending, responses))
+
+    results = []
+    cache_updated = False
+    for name in to_verify:
+        if name not in responses:
+            results.append(cache[hashes[name]])
+            print(f"  {name}: cached ✓")
+            continue
+
+        response_text = responses[name]
+        if isinstance(response_text, Exception):
+            print(f"  {name}: ERROR calling API — {response_text}")
+            continue
 
         if not dry_run:
             try:
-                result = json.loads(response_text.strip().strip("`").strip())
+                result = parse_response(response_text)
                 results.append(result)
+                cache[hashes[name]] = result
+                cache_updated = True
                 corrections = result.get("corrections", [])
                 if corrections:
                     print(f"  {name}: CORRECTED — {corrections}")
                 else:
                     print(f"  {name}: Confirmed ✓")
-            except json.JSONDecodeError as e:
+            except JSONDecodeError as e:
                 print(f"  {name}: ERROR parsing — {e}")
 
+    if cache_updated:
+        save_verify_cache(cache)
+    return results
+
+
+async def run_all(verified: set, dry_run: bool = False):
+    """Research all unresearched batches (2-7) concurrently."""
+    batch_nums = range(2, 8)
+    batch_results = await asyncio.gather(
+        *(run_batch(n, verified, dry_run) for n in batch_nums),
+        return_exceptions=True,
+    )
+
+    # One failed batch shouldn't discard the others' results
+    results = []
+    for batch_num, batch_result in zip(batch_nums, batch_results):
+        if isinstance(batch_result, Exception):
+            print(f"  ERROR in batch {batch_num}: {batch_result}")
+            continue
+        results.extend(batch_result)
+    return results
+
+
+async def run_all_batch_api(verified: set, dry_run: bool = False):
+    """Research all unresearched batches (2-7) in one Message Batches API job."""
+    prompts = {}
+    for batch_num in range(2, 8):
+        user_prompt = prepare_batch(batch_num, verified)
+        if user_prompt is not None:
+            prompts[batch_num] = user_prompt
+
+    if not prompts:
+        return []
+
+    if dry_run:
+        for user_prompt in prompts.values():
+            await call_haiku(SYSTEM_PROMPT, user_prompt, dry_run)
+        return []
+
+    results = []
+    for batch_num, user_prompt in list(prompts.items()):
+        cached = read_cached_response(SYSTEM_PROMPT, user_prompt)
+        if cached is not None:
+            del prompts[batch_num]
+            save_raw_response(batch_num, cached)
+            results.extend(handle_batch_response(batch_num, cached))
+
+    if not prompts:
+        return results
+
+    client = get_client()
+    batch = await client.messages.batches.create(
+        requests=[
+            {"custom_id": f"batch_{n}", "params": build_request_params(SYSTEM_PROMPT, user_prompt)}
+            for n, user_prompt in prompts.items()
+        ]
+    )
+    print(f"Submitted message batch {batch.id} ({len(prompts)} requests). Polling every {BATCH_POLL_INTERVAL}s...")
+
+    while batch.processing_status != "ended":
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+        batch = await client.messages.batches.retrieve(batch.id)
+
+    async for entry in await client.messages.batches.results(batch.id):
+        batch_num = int(entry.custom_id.removeprefix("batch_"))
+        if entry.result.type != "succeeded":
+            print(f"  ERROR in batch {batch_num}: request {entry.result.type}")
+            continue
+        response_text = extract_text(entry.result.message)
+        write_cached_response(SYSTEM_PROMPT, prompts[batch_num], response_text)
+        save_raw_response(batch_num, response_text)
+        results.extend(handle_batch_response(batch_num, response_text))
     return results
 
 
@@ -252,8 +550,10 @@ def merge_results(seed: dict, new_results: list) -> list:
         if county_name:
             seed[county_name] = result
 
-    # Return as sorted list
-    return [seed[k] for k in sorted(seed.keys())]
+    # Return in canonical county order, with any non-PA names last
+    records = [seed[c] for c in _CANONICAL_COUNTIES if c in seed]
+    records.extend(seed[k] for k in sorted(seed.keys() - ALL_COUNTIES))
+    return records
 
 
 def write_csv(records: list, output_path: Path):
@@ -269,10 +569,15 @@ def write_csv(records: list, output_path: Path):
         "in_person_free", "notes", "source_url", "last_verified", "status"
     ]
 
+    # Flatten to tuples up front (missing fields blank, extras dropped) and write in one call
+    getter = itemgetter(*fieldnames)
+    defaults = dict.fromkeys(fieldnames, "")
+    rows = [getter({**defaults, **record}) for record in records]
+
     with open(output_path, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
-        writer.writeheader()
-        writer.writerows(records)
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
 
     print(f"Wrote {len(records)} records to {output_path}")
 
@@ -286,7 +591,11 @@ def main():
     parser.add_argument("--verify", action="store_true", help="Verify needs_review entries.")
     parser.add_argument("--dry-run", action="store_true", help="Print prompts without calling API.")
     parser.add_argument("--all", action="store_true", help="Run all unresearched batches (2-7).")
+    parser.add_argument("--use-batch-api", action="store_true",
+                        help="With --all, submit through the Message Batches API (cheaper, slower turnaround).")
     args = parser.parse_args()
+    if args.use_batch_api and (args.verify or args.batch or not args.all):
+        parser.error("--use-batch-api only applies to --all (not --batch or --verify).")
 
     # Check API key
     if not args.dry_run and not os.environ.get("ANTHROPIC_API_KEY"):
@@ -295,25 +604,25 @@ def main():
 
     seed = load_seed_data()
     print(f"Loaded {len(seed)} seeded counties.\n")
+    verified = get_seeded_counties(seed, "verified")
 
     all_new_results = []
 
     if args.verify:
-        results = run_verify(seed, args.dry_run)
+        results = asyncio.run(run_verify(seed, args.dry_run))
         all_new_results.extend(results)
 
     elif args.batch:
         if args.batch == 1:
             print("Batch 1 is pre-seeded. Use --verify to check existing data.")
             sys.exit(0)
-        results = run_batch(args.batch, seed, args.dry_run)
+        results = asyncio.run(run_batch(args.batch, verified, args.dry_run))
         all_new_results.extend(results)
 
     elif args.all:
-        for batch_num in range(2, 8):
-            results = run_batch(batch_num, seed, args.dry_run)
-            all_new_results.extend(results)
-            print()
+        run = run_all_batch_api if args.use_batch_api else run_all
+        results = asyncio.run(run(verified, args.dry_run))
+        all_new_results.extend(results)
 
     else:
         parser.print_help()
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+
+import validate
+
+FIXTURES = Path(__file__).parent / "fixtures"
+SEED_FILE = Path(__file__).parent.parent / "seed_counties.csv"
+
+requires_pandas = pytest.mark.skipif(validate.pd is None, reason="pandas not installed")
+
+
+def validate_both(filepath: Path, monkeypatch):
+    """Run the pandas and row-by-row validators on the same file."""
+    with_pandas = validate.validate(filepath)
+    monkeypatch.setattr(validate, "pd", None)
+    return with_pandas, validate.validate(filepath)
+
+
+@requires_pandas
+@pytest.mark.parametrize("filepath", [
+    SEED_FILE,
+    FIXTURES / "all_checks.csv",
+    FIXTURES / "extra_field_mid.csv",
+    FIXTURES / "extra_field_only_row.csv",
+])
+def test_pandas_and_row_paths_agree(filepath, monkeypatch):
+    with_pandas, row_by_row = validate_both(filepath, monkeypatch)
+    assert with_pandas == row_by_row
+
+
+def test_all_checks_fixture_triggers_every_rule(monkeypatch):
+    monkeypatch.setattr(validate, "pd", None)
+    errors, warnings, *_ = validate.validate(FIXTURES / "all_checks.csv")
+    errors, warnings = "\n".join(errors), "\n".join(warnings)
+
+    for expected in [
+        "Missing required field 'access_tier'",
+        "Missing required field 'fips'",
+        "Invalid FIPS '4200'",
+        "Invalid FIPS '43001'",
+        "Invalid access_tier 'bogus'",
+        "Invalid status 'maybe'",
+        "Duplicate county 'Allegheny'",
+    ]:
+        assert expected in errors
+
+    for expected in [
+        "Unknown county name 'Gotham'",
+        "'free_search' = 'yes' (expected true/false)",
+        "access_tier='free' but subscription_required=true",
+        "access_tier='paywalled' but free_view=true",
+        "status='verified' but no source_url",
+        "recorder_url/notes reference ['landex']",
+        "Missing 2 counties",
+    ]:
+        assert expected in warnings
@@ -2,6 +2,7 @@
 PA County Records Audit — Data Validator
 =========================================
 Validates counties.csv for schema compliance, completeness, and consistency.
+Uses pandas for vectorised checks when installed (pip install pandas).
 
 Usage:
     python validate.py                     # Validate data/counties.csv
@@ -9,16 +10,42 @@ Usage:
 """
 
 import csv
+import io
+import re
 import sys
 from pathlib import Path
 from collections import Counter
+from warnings import catch_warnings, simplefilter
+
+from constants import ALL_COUNTIES
+
+try:
+    import pandas as pd
+except ImportError:  # pandas is optional; fall back to row-by-row validation
+    pd = None
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 TOTAL_PA_COUNTIES = 67
 
-VALID_TIERS = {"free", "partial", "paywalled", "none"}
-VALID_STATUSES = {"verified", "needs_review", "unresearched"}
-VALID_BOOLEANS = {"true", "false", "True", "False", ""}
+VALID_TIERS = frozenset({"free", "partial", "paywalled", "none"})
+VALID_STATUSES = frozenset({"verified", "needs_review", "unresearched"})
+VALID_BOOLEANS = frozenset({"true", "false", "True", "False", ""})
+
+_FIPS_RE = re.compile(r"42[0-9]{3}")
+
+# Vendor fingerprints in recorder_url/notes -> names expected in the vendor field
+_VENDOR_HINTS = {
+    "landex": ("landex",),
+    "govos": ("govos", "kofile", "cott"),
+    "kofile": ("govos", "kofile"),
+    "cottsystems": ("cott", "govos"),
+    "countygovernmentrecords": ("tyler",),
+    "fidlar": ("fidlar",),
+    "uslandrecords": ("uslandrecords",),
+}
+# One alternation scans for every vendor in a single pass over the text
+_VENDOR_RE = re.compile("|".join(_VENDOR_HINTS), re.IGNORECASE)
+_NON_ALPHA_RE = re.compile(r"[^a-z]")
 
 REQUIRED_FIELDS = [
     "county", "fips", "access_tier", "status"
@@ -30,52 +57,95 @@ ALL_FIELDS = [
     "subscription_required", "fee_structure", "records_start_year",
     "in_person_free", "notes", "source_url", "last_verified", "status"
 ]
+ALL_FIELDS_SET = frozenset(ALL_FIELDS)
 
-# All 67 PA county names
-ALL_COUNTIES = {
-    "Adams", "Allegheny", "Armstrong", "Beaver", "Bedford", "Berks", "Blair",
-    "Bradford", "Bucks", "Butler", "Cambria", "Cameron", "Carbon", "Centre",
-    "Chester", "Clarion", "Clearfield", "Clinton", "Columbia", "Crawford",
-    "Cumberland", "Dauphin", "Delaware", "Elk", "Erie", "Fayette", "Forest",
-    "Franklin", "Fulton", "Greene", "Huntingdon", "Indiana", "Jefferson",
-    "Juniata", "Lackawanna", "Lancaster", "Lawrence", "Lebanon", "Lehigh",
-    "Luzerne", "Lycoming", "McKean", "Mercer", "Mifflin", "Monroe", "Montgomery",
-    "Montour", "Northampton", "Northumberland", "Perry", "Philadelphia", "Pike",
-    "Potter", "Schuylkill", "Snyder", "Somerset", "Sullivan", "Susquehanna",
-    "Tioga", "Union", "Venango", "Warren", "Washington", "Wayne", "Westmoreland",
-    "Wyoming", "York"
-}
+BOOL_FIELDS = (
+    "free_search", "free_view", "free_download", "subscription_required", "in_person_free"
+)
 
 
-def validate(filepath: Path) -> tuple[list, list]:
-    """Validate CSV file. Returns (errors, warnings)."""
+def validate(filepath: Path) -> tuple[list, list, int, Counter, Counter]:
+    """Validate CSV file. Returns (errors, warnings, row_count, tier_counts, status_counts)."""
     errors = []
     warnings = []
 
     if not filepath.exists():
         errors.append(f"File not found: {filepath}")
-        return errors, warnings
+        return errors, warnings, 0, Counter(), Counter()
 
-    with open(filepath, "r") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    df = _read_frame(filepath) if pd is not None else None
+    if df is not None:
+        fieldnames = list(df.columns)
+        row_count = len(df)
+        counties_found, tier_counts, status_counts = _check_frame(df, errors, warnings)
+    else:
+        # Validate while reading so rows are never held in memory all at once
+        with open(filepath, "r") as f:
+            reader = csv.DictReader(f)
+            row_count, counties_found, tier_counts, status_counts = _check_rows(reader, errors, warnings)
+        fieldnames = reader.fieldnames
 
     # Check header
-    missing_fields = set(ALL_FIELDS) - set(reader.fieldnames or [])
+    missing_fields = ALL_FIELDS_SET.difference(fieldnames or ())
     if missing_fields:
-        errors.append(f"Missing columns: {missing_fields}")
+        errors.insert(0, f"Missing columns: {sorted(missing_fields)}")
+
+    # Completeness
+    missing_counties = ALL_COUNTIES - counties_found
+    if missing_counties:
+        warnings.append(f"Missing {len(missing_counties)} counties: {sorted(missing_counties)}")
+
+    return errors, warnings, row_count, tier_counts, status_counts
+
 
+def _vendor_mismatches(vendor: str, text: str) -> list:
+    """Vendors referenced in text that the vendor field doesn't mention."""
+    detected = {match.group().lower() for match in _VENDOR_RE.finditer(text)}
+    if not detected:
+        return []
+    vendor = _NON_ALPHA_RE.sub("", vendor.lower())
+    return sorted(d for d in detected if not any(hint in vendor for hint in _VENDOR_HINTS[d]))
+
+
+def _read_frame(filepath: Path):
+    """Read the CSV into a DataFrame, or return None if it has malformed rows.
+
+    pandas raises on, or silently truncates, rows with extra fields (e.g. an
+    unquoted comma in notes); those files go through _check_rows instead so
+    they are reported exactly like the row-by-row path.
+    """
+    try:
+        with catch_warnings():
+            simplefilter("error", pd.errors.ParserWarning)
+            return pd.read_csv(filepath, dtype=str, keep_default_na=False, index_col=False)
+    except (pd.errors.ParserError, pd.errors.ParserWarning):
+        return None
+
+
+def _check_rows(rows, errors: list, warnings: list):
+    """Row-by-row checks over any iterable of row dicts.
+
+    Returns (row_count, counties_found, tier_counts, status_counts).
+    """
     # Track counties found
+    row_count = 0
     counties_found = set()
     tier_counts = Counter()
     status_counts = Counter()
 
     for i, row in enumerate(rows, start=2):  # CSV line numbers (1-indexed + header)
-        county = row.get("county", "").strip()
+        row_count += 1
+        # Strip (and lowercase booleans) once per row
+        required = {field: row.get(field, "").strip() for field in REQUIRED_FIELDS}
+        bools = {bool_field: row.get(bool_field, "").strip().lower() for bool_field in BOOL_FIELDS}
+        county = required["county"]
+        fips = required["fips"]
+        tier = required["access_tier"]
+        status = required["status"]
 
         # Required fields
-        for field in REQUIRED_FIELDS:
-            if not row.get(field, "").strip():
+        for field, val in required.items():
+            if not val:
                 errors.append(f"Row {i} ({county}): Missing required field '{field}'")
 
         # County name validation
@@ -87,44 +157,112 @@ def validate(filepath: Path) -> tuple[list, list]:
         counties_found.add(county)
 
         # FIPS validation
-        fips = row.get("fips", "").strip()
-        if fips and (not fips.startswith("42") or len(fips) != 5):
+        if fips and not _FIPS_RE.fullmatch(fips):
             errors.append(f"Row {i} ({county}): Invalid FIPS '{fips}' (should be 42XXX)")
 
         # Enum validation
-        tier = row.get("access_tier", "").strip()
         if tier and tier not in VALID_TIERS:
             errors.append(f"Row {i} ({county}): Invalid access_tier '{tier}'")
         tier_counts[tier] += 1
 
-        status = row.get("status", "").strip()
         if status and status not in VALID_STATUSES:
             errors.append(f"Row {i} ({county}): Invalid status '{status}'")
         status_counts[status] += 1
 
         # Boolean validation
-        for bool_field in ["free_search", "free_view", "free_download", "subscription_required", "in_person_free"]:
-            val = row.get(bool_field, "").strip().lower()
-            if val and val not in {"true", "false"}:
-                warnings.append(f"Row {i} ({county}): '{bool_field}' = '{val}' (expected true/false)")
+        warnings.extend(
+            f"Row {i} ({county}): '{bool_field}' = '{val}' (expected true/false)"
+            for bool_field, val in bools.items() if val not in VALID_BOOLEANS
+        )
 
         # Consistency checks
-        if tier == "free" and row.get("subscription_required", "").strip().lower() == "true":
+        if tier == "free" and bools["subscription_required"] == "true":
             warnings.append(f"Row {i} ({county}): access_tier='free' but subscription_required=true")
 
-        if tier == "paywalled" and row.get("free_view", "").strip().lower() == "true":
+        if tier == "paywalled" and bools["free_view"] == "true":
             warnings.append(f"Row {i} ({county}): access_tier='paywalled' but free_view=true")
 
         # Verified entries should have source_url
         if status == "verified" and not row.get("source_url", "").strip():
             warnings.append(f"Row {i} ({county}): status='verified' but no source_url")
 
-    # Completeness
-    missing_counties = ALL_COUNTIES - counties_found
-    if missing_counties:
-        warnings.append(f"Missing {len(missing_counties)} counties: {sorted(missing_counties)}")
-
-    return errors, warnings, rows, tier_counts, status_counts
+        # Vendor named in URL/notes should match the vendor field
+        mismatched = _vendor_mismatches(
+            row.get("vendor", ""), f"{row.get('recorder_url', '')} {row.get('notes', '')}"
+        )
+        if mismatched:
+            warnings.append(f"Row {i} ({county}): vendor '{row.get('vendor', '').strip()}' "
+                            f"but recorder_url/notes reference {mismatched}")
+
+    return row_count, counties_found, tier_counts, status_counts
+
+
+def _check_frame(df, errors: list, warnings: list):
+    """Vectorised equivalent of _check_rows for a pandas DataFrame.
+
+    Each check is a column-wise mask; messages are then ordered by row so
+    the report matches the row-by-row validator exactly.
+    """
+    df = df.reindex(columns=ALL_FIELDS, fill_value="").apply(lambda col: col.str.strip())
+    county, fips, tier, status = df["county"], df["fips"], df["access_tier"], df["status"]
+    bools = {bool_field: df[bool_field].str.lower() for bool_field in BOOL_FIELDS}
+    row_errors = []
+    row_warnings = []
+
+    def flag(target: list, mask, message):
+        target.extend((i, message(i + 2)) for i in df.index[mask])  # CSV line numbers
+
+    # Required fields
+    for field in REQUIRED_FIELDS:
+        flag(row_errors, df[field].eq(""),
+             lambda i: f"Row {i} ({county[i - 2]}): Missing required field '{field}'")
+
+    # County name validation
+    flag(row_warnings, county.ne("") & ~county.isin(ALL_COUNTIES),
+         lambda i: f"Row {i}: Unknown county name '{county[i - 2]}'")
+    flag(row_errors, county.duplicated(),
+         lambda i: f"Row {i}: Duplicate county '{county[i - 2]}'")
+
+    # FIPS validation
+    flag(row_errors, fips.ne("") & ~fips.str.fullmatch(_FIPS_RE),
+         lambda i: f"Row {i} ({county[i - 2]}): Invalid FIPS '{fips[i - 2]}' (should be 42XXX)")
+
+    # Enum validation
+    flag(row_errors, tier.ne("") & ~tier.isin(VALID_TIERS),
+         lambda i: f"Row {i} ({county[i - 2]}): Invalid access_tier '{tier[i - 2]}'")
+    flag(row_errors, status.ne("") & ~status.isin(VALID_STATUSES),
+         lambda i: f"Row {i} ({county[i - 2]}): Invalid status '{status[i - 2]}'")
+
+    # Boolean validation
+    for bool_field, vals in bools.items():
+        flag(row_warnings, ~vals.isin(VALID_BOOLEANS),
+             lambda i: f"Row {i} ({county[i - 2]}): '{bool_field}' = '{vals[i - 2]}' (expected true/false)")
+
+    # Consistency checks
+    flag(row_warnings, tier.eq("free") & bools["subscription_required"].eq("true"),
+         lambda i: f"Row {i} ({county[i - 2]}): access_tier='free' but subscription_required=true")
+    flag(row_warnings, tier.eq("paywalled") & bools["free_view"].eq("true"),
+         lambda i: f"Row {i} ({county[i - 2]}): access_tier='paywalled' but free_view=true")
+
+    # Verified entries should have source_url
+    flag(row_warnings, status.eq("verified") & df["source_url"].eq(""),
+         lambda i: f"Row {i} ({county[i - 2]}): status='verified' but no source_url")
+
+    # Vendor named in URL/notes should match the vendor field
+    vendor = df["vendor"]
+    mismatched = pd.Series(
+        [_vendor_mismatches(v, f"{url} {notes}") for v, url, notes in zip(vendor, df["recorder_url"], df["notes"])],
+        index=df.index,
+    )
+    flag(row_warnings, mismatched.astype(bool),
+         lambda i: f"Row {i} ({county[i - 2]}): vendor '{vendor[i - 2]}' "
+                   f"but recorder_url/notes reference {mismatched[i - 2]}")
+
+    # Stable sort keeps each row's messages in check order
+    errors.extend(msg for _, msg in sorted(row_errors, key=lambda item: item[0]))
+    warnings.extend(msg for _, msg in sorted(row_warnings, key=lambda item: item[0]))
+
+    return set(county), Counter(tier.value_counts().to_dict()), Counter(status.value_counts().to_dict())
 
 
 def main():
@@ -134,49 +272,53 @@ def main():
     if not filepath.exists():
         filepath = DATA_DIR / "seed_counties.csv"
 
-    print(f"Validating: {filepath}\n")
+    # Build the whole report, then write it to stdout in one call
+    buf = io.StringIO()
+    w = buf.write
+    w(f"Validating: {filepath}\n\n")
 
-    errors, warnings, rows, tier_counts, status_counts = validate(filepath)
+    errors, warnings, row_count, tier_counts, status_counts = validate(filepath)
 
     # Summary
-    print(f"{'='*50}")
-    print(f"  PA County Records Audit — Validation Report")
-    print(f"{'='*50}")
-    print(f"  Total rows:        {len(rows)}")
-    print(f"  Target:            {TOTAL_PA_COUNTIES} counties")
-    print(f"  Coverage:          {len(rows)}/{TOTAL_PA_COUNTIES} ({len(rows)/TOTAL_PA_COUNTIES*100:.0f}%)")
-    print()
-    print(f"  Access Tiers:")
+    w(f"{'='*50}\n")
+    w(f"  PA County Records Audit — Validation Report\n")
+    w(f"{'='*50}\n")
+    w(f"  Total rows:        {row_count}\n")
+    w(f"  Target:            {TOTAL_PA_COUNTIES} counties\n")
+    w(f"  Coverage:          {row_count}/{TOTAL_PA_COUNTIES} ({row_count/TOTAL_PA_COUNTIES*100:.0f}%)\n")
+    w("\n")
+    w(f"  Access Tiers:\n")
     for tier in ["free", "partial", "paywalled", "none", ""]:
         count = tier_counts.get(tier, 0)
         label = tier if tier else "(blank)"
         if count:
-            print(f"    {label:15s} {count:3d}  {'█' * count}")
-    print()
-    print(f"  Status:")
+            w(f"    {label:15s} {count:3d}  {'█' * count}\n")
+    w("\n")
+    w(f"  Status:\n")
     for status in ["verified", "needs_review", "unresearched", ""]:
         count = status_counts.get(status, 0)
         label = status if status else "(blank)"
         if count:
-            print(f"    {label:15s} {count:3d}  {'█' * count}")
+            w(f"    {label:15s} {count:3d}  {'█' * count}\n")
 
     # Errors
-    print()
+    w("\n")
     if errors:
-        print(f"  ❌ {len(errors)} ERRORS:")
+        w(f"  ❌ {len(errors)} ERRORS:\n")
         for e in errors:
-            print(f"     • {e}")
+            w(f"     • {e}\n")
     else:
-        print(f"  ✅ No errors!")
+        w(f"  ✅ No errors!\n")
 
     if warnings:
-        print(f"\n  ⚠️  {len(warnings)} WARNINGS:")
-        for w in warnings:
-            print(f"     • {w}")
+        w(f"\n  ⚠️  {len(warnings)} WARNINGS:\n")
+        for warning in warnings:
+            w(f"     • {warning}\n")
     else:
-        print(f"  ✅ No warnings!")
+        w(f"  ✅ No warnings!\n")
 
-    print()
+    w("\n")
+    sys.stdout.write(buf.getvalue())
     sys.exit(1 if errors else 0)
 
 